@@ -7,20 +7,23 @@
 # - Fade-like animation on signal lamps + soft control-room beep
 # ---------------------------------------------------------------
 
-import sys, math, time, os, wave, struct, tempfile
+import sys, math, time, os, wave, tempfile
 from collections import deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
 
 from PySide6.QtCore import (
     Qt, QTimer, QPointF, QRectF, QEasingCurve, Property, QObject, QUrl, QPropertyAnimation
 )
 from PySide6.QtGui import (
-    QPainter, QPen, QBrush, QColor, QFont
+    QPainter, QPen, QBrush, QColor, QFont, QPainterPath, QPixmap
 )
 from PySide6.QtMultimedia import QSoundEffect
 from PySide6.QtWidgets import (
     QApplication, QGraphicsView, QGraphicsScene, QGraphicsItem, QGraphicsEllipseItem,
-    QGraphicsRectItem, QGraphicsSimpleTextItem, QGraphicsTextItem, QLabel, QWidget, QVBoxLayout, QHBoxLayout,
+    QGraphicsRectItem, QGraphicsPathItem, QGraphicsLineItem, QGraphicsSimpleTextItem, QGraphicsTextItem, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QFrame, QMainWindow
 )
 
@@ -44,6 +47,9 @@ VIEW_W, VIEW_H = 1280, 720
 # Timing (scaled for demo)
 APPROACH_TIME = 2.0   # “checking/route setting” ~2s
 DWELL_FRAMES  = 90    # platform dwell ~3s @30fps
+TICK_MS       = 33    # simulation frame (~30fps)
+IDLE_TICK_MS  = 250   # idle station: clock refresh only
+CLOCK_EVERY   = 8     # clock refresh every Nth frame (~264ms)
 
 # ------------ Utility: soft beep ------------
 def ensure_soft_beep_wav() -> str:
@@ -59,43 +65,65 @@ def ensure_soft_beep_wav() -> str:
         wf.setnchannels(1)
         wf.setsampwidth(2)
         wf.setframerate(framerate)
-        for i in range(nframes):
-            t = i / framerate
-            env = min(1.0, i/(0.005*framerate), (nframes - i)/(0.005*framerate))
-            sample = int(32767 * amplitude * math.sin(2*math.pi*freq*t) * env)
-            wf.writeframes(struct.pack('<h', sample))
+        # synthesize whole buffer at once (sine * 5ms attack/release ramp)
+        i = np.arange(nframes)
+        t = i / framerate
+        ramp = 0.005 * framerate
+        env = np.minimum.reduce([np.ones(nframes), i/ramp, (nframes - i)/ramp]).clip(0.0, 1.0)
+        samples = (32767 * amplitude * np.sin(2*np.pi*freq*t) * env).astype('<i2')
+        wf.writeframes(samples.tobytes())
     return path
 
+BEEP_WAV  = ensure_soft_beep_wav()   # resolved once per process
+BEEP_POOL = 3                        # round-robin voices so rapid aspect changes don't drop beeps
+
 # ------------ Graphics primitives ------------
-class TrackItem(QGraphicsItem):
+class TrackItem(QGraphicsLineItem):
     def __init__(self, x1, y1, x2, y2, name, thickness=7):
-        super().__init__()
+        super().__init__(x1, y1, x2, y2)
         self.p1 = QPointF(x1, y1)
         self.p2 = QPointF(x2, y2)
         self.name = name
         self.thick = thickness
-        self.occupied = False
-        self.reserved = False
+        # pens built once; state changes only swap them
+        self._pen_normal   = QPen(COL_TRACK, thickness, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        self._pen_occupied = QPen(QColor(255, 90, 90), thickness, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        self._pen_reserved = QPen(COL_ACTIVE, thickness-3, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        self._occupied = False
+        self._reserved = False
+        self.setPen(self._pen_normal)
         self.setZValue(1)
-
-    def boundingRect(self):
-        extra = self.thick/2 + 4
-        return QRectF(min(self.p1.x(), self.p2.x())-extra,
-                      min(self.p1.y(), self.p2.y())-extra,
-                      abs(self.p1.x()-self.p2.x()) + 2*extra,
-                      abs(self.p1.y()-self.p2.y()) + 2*extra)
-
-    def paint(self, painter, option, widget):
-        painter.setRenderHint(QPainter.Antialiasing)
-        pen = QPen(COL_TRACK, self.thick, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
-        if self.occupied:
-            pen.setColor(QColor(255, 90, 90))
-        painter.setPen(pen)
-        painter.drawLine(self.p1, self.p2)
-        if self.reserved and not self.occupied:
-            hl = QPen(COL_ACTIVE, self.thick-3, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
-            painter.setPen(hl)
-            painter.drawLine(self.p1, self.p2)
+        # reserved highlight: child line shown/hidden instead of painted conditionally
+        self._overlay = QGraphicsLineItem(x1, y1, x2, y2)
+        self._overlay.setParentItem(self)
+        self._overlay.setPen(self._pen_reserved)
+        self._overlay.setVisible(False)
+
+    def bake_normal(self):
+        # idle gray line now lives in the view's static layer; keep only state colors live
+        self._pen_normal = QPen(Qt.NoPen)
+        if not self._occupied:
+            self.setPen(self._pen_normal)
+
+    # state setters touch the items only when the value actually flips
+    @property
+    def occupied(self): return self._occupied
+    @occupied.setter
+    def occupied(self, v):
+        v = bool(v)
+        if v != self._occupied:
+            self._occupied = v
+            self.setPen(self._pen_occupied if v else self._pen_normal)
+            self._overlay.setVisible(self._reserved and not v)
+
+    @property
+    def reserved(self): return self._reserved
+    @reserved.setter
+    def reserved(self, v):
+        v = bool(v)
+        if v != self._reserved:
+            self._reserved = v
+            self._overlay.setVisible(v and not self._occupied)
 
 # -------- Signal Lamps with fade (QObject + QGraphicsEllipseItem) --------
 class SignalLamp(QObject, QGraphicsEllipseItem):
@@ -107,6 +135,8 @@ class SignalLamp(QObject, QGraphicsEllipseItem):
         self.setPos(x, y)
         self.color = QColor(255, 0, 0)
         self.opacity_val = 1.0
+        self._lamp_col = QColor(self.color)   # color + current alpha
+        self._brush = QBrush(self._lamp_col)  # reused by paint()
         self.setZValue(9)
 
         self._fade_anim = QPropertyAnimation(self, b"lampOpacity", self)
@@ -115,6 +145,12 @@ class SignalLamp(QObject, QGraphicsEllipseItem):
 
     def setColor(self, col: QColor):
         self.color = col
+        self._lamp_col = QColor(col)
+        self._refresh_brush()
+
+    def _refresh_brush(self):
+        self._lamp_col.setAlphaF(self.opacity_val)
+        self._brush.setColor(self._lamp_col)
         self.update()
 
     def fadeTo(self, target: float):
@@ -124,37 +160,35 @@ class SignalLamp(QObject, QGraphicsEllipseItem):
         self._fade_anim.start()
 
     def getLampOpacity(self): return self.opacity_val
-    def setLampOpacity(self, v): self.opacity_val = float(v); self.update()
+    def setLampOpacity(self, v): self.opacity_val = float(v); self._refresh_brush()
     lampOpacity = Property(float, fget=getLampOpacity, fset=setLampOpacity)
 
     def paint(self, painter, option, widget):
-        painter.setRenderHint(QPainter.Antialiasing)
-        c = QColor(self.color); c.setAlphaF(self.opacity_val)
-        painter.setPen(Qt.NoPen); painter.setBrush(QBrush(c))
+        painter.setPen(Qt.NoPen); painter.setBrush(self._brush)
         painter.drawEllipse(self.rect())
 
 # -------- Signal Head (สามดวง R/Y/G) --------
 class SignalHead(QGraphicsItem):
-    def __init__(self, x, y, name, beep: QSoundEffect):
+    def __init__(self, x, y, name, beep: Callable[[], None]):
         super().__init__()
         self.name = name
         self.beep = beep
+        # static housing as a child item; the head itself draws nothing
+        housing = QPainterPath(); housing.addRoundedRect(-14, -4, 28, 60, 6, 6)
+        self.housing = QGraphicsPathItem(housing, self)
+        self.housing.setPen(Qt.NoPen); self.housing.setBrush(QBrush(QColor(40, 45, 70)))
+        self.housing.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
         self.R = SignalLamp(0, 0, 10, self)
         self.Y = SignalLamp(0, 22, 10, self)
         self.G = SignalLamp(0, 44, 10, self)
+        self.setFlag(QGraphicsItem.ItemHasNoContents, True)
         self.setPos(x, y)
         self.setZValue(8)
         self.aspect = "RED"
         self.update_aspect_immediate("RED")
 
     def boundingRect(self):
-        return QRectF(-14, -4, 28, 60)
-
-    def paint(self, p, o, w):
-        p.setRenderHint(QPainter.Antialiasing)
-        p.setPen(Qt.NoPen)
-        p.setBrush(QBrush(QColor(40, 45, 70)))
-        p.drawRoundedRect(-14, -4, 28, 60, 6, 6)
+        return self.childrenBoundingRect()
 
     def update_aspect_immediate(self, aspect):
         self.aspect = aspect
@@ -165,18 +199,11 @@ class SignalHead(QGraphicsItem):
     def set_aspect(self, aspect):
         if aspect == self.aspect: return
         self.aspect = aspect
-        # simple stepped fade
-        for step in range(0, 6):
-            v_on  = 0.18 + (1.0-0.18)*(step/5.0)
-            v_off = 1.0 - (1.0-0.18)*(step/5.0)
-            if aspect == "GREEN":
-                self.R.setLampOpacity(v_off); self.Y.setLampOpacity(v_off); self.G.setLampOpacity(v_on)
-            elif aspect == "YELLOW":
-                self.R.setLampOpacity(v_off); self.Y.setLampOpacity(v_on);  self.G.setLampOpacity(v_off)
-            else:
-                self.R.setLampOpacity(v_on);  self.Y.setLampOpacity(v_off); self.G.setLampOpacity(v_off)
-            QApplication.processEvents()
-        self.beep.play()
+        # fade via each lamp's QPropertyAnimation (no nested event loop)
+        self.R.fadeTo(1.0 if aspect == "RED" else 0.18)
+        self.Y.fadeTo(1.0 if aspect == "YELLOW" else 0.18)
+        self.G.fadeTo(1.0 if aspect == "GREEN" else 0.18)
+        self.beep()
 
 # ------------ Train ------------
 class TrainItem(QGraphicsItem):
@@ -184,6 +211,14 @@ class TrainItem(QGraphicsItem):
         super().__init__()
         self.path = path_points
         self.idx = 0
+        # per-segment (x0, y0, ux, uy, length, angle_deg); zero-length skipped
+        self.segs = []
+        for a, b in zip(path_points, path_points[1:]):
+            dx, dy = b.x() - a.x(), b.y() - a.y()
+            L = math.hypot(dx, dy)
+            if L > 1e-6:
+                self.segs.append((a.x(), a.y(), dx/L, dy/L, L, math.degrees(math.atan2(dy, dx))))
+        self._traveled = 0.0   # distance along current segment
         self.speed_px = speed_px
         self.in_dwell = False
         self.dwell_counter = 0
@@ -191,6 +226,8 @@ class TrainItem(QGraphicsItem):
         self.setZValue(20)
         if self.path:
             self.setPos(self.path[0])
+        if self.segs:
+            self.setRotation(self.segs[0][5])
         # anti re-capture flags
         self.skip_platform_ticks = 0
         self.has_dwelled_main = False
@@ -200,7 +237,6 @@ class TrainItem(QGraphicsItem):
         return QRectF(-18, -10, 36, 20)
 
     def paint(self, p, o, w):
-        p.setRenderHint(QPainter.Antialiasing)
         p.setPen(Qt.NoPen)
         # body
         p.setBrush(QBrush(QColor("#e6e7eb")))
@@ -214,32 +250,66 @@ class TrainItem(QGraphicsItem):
         p.drawRoundedRect(2, -5, 10, 10, 2, 2)
 
     def step(self):
-        if not self.path or self.idx >= len(self.path) - 1:
+        if self.idx >= len(self.segs):
             return True
         if self.in_dwell or self.speed_px <= 0:
             return False
-        x, y = self.pos().x(), self.pos().y()
-        tx, ty = self.path[self.idx + 1].x(), self.path[self.idx + 1].y()
-        dx, dy = tx - x, ty - y
-        d = math.hypot(dx, dy)
-        if d < 1e-6:
+        self._traveled += self.speed_px
+        seg = self.segs[self.idx]
+        while self._traveled >= seg[4] - 1e-6:
+            self._traveled -= seg[4]
             self.idx += 1
-            return self.idx >= len(self.path) - 1
-        step = min(d, self.speed_px)
-        self.setPos(x + dx / d * step, y + dy / d * step)
-        ang = math.degrees(math.atan2(dy, dx))
-        self.setRotation(ang)
-        if step >= d - 1e-6:
-            self.idx += 1
-            return self.idx >= len(self.path) - 1
+            if self.idx >= len(self.segs):
+                self.setPos(self.path[-1])
+                return True
+            seg = self.segs[self.idx]
+            self.setRotation(seg[5])
+        x0, y0, ux, uy = seg[0], seg[1], seg[2], seg[3]
+        self.setPos(x0 + ux*self._traveled, y0 + uy*self._traveled)
         return False
 
+def step_trains(trains: list[TrainItem]) -> list[TrainItem]:
+    """Advance all trains one frame; returns the ones that reached the end."""
+    if len(trains) < 2:
+        return [tr for tr in trains if tr.step()]
+    # SoA pass over trains moving inside their current segment
+    movers = [tr for tr in trains if tr.idx < len(tr.segs) and not tr.in_dwell and tr.speed_px > 0]
+    batched = set()
+    if movers:
+        seg = np.array([tr.segs[tr.idx] for tr in movers])            # (N, 6)
+        trav = np.fromiter((tr._traveled + tr.speed_px for tr in movers), float, len(movers))
+        inside = trav < seg[:, 4] - 1e-6
+        xs = seg[:, 0] + seg[:, 2]*trav
+        ys = seg[:, 1] + seg[:, 3]*trav
+        for k in np.flatnonzero(inside):
+            tr = movers[k]
+            tr._traveled = float(trav[k]); tr.setPos(float(xs[k]), float(ys[k]))
+            batched.add(tr)
+    # segment changes, dwell and finished trains go through the scalar path
+    return [tr for tr in trains if tr not in batched and tr.step()]
+
+# ------------ View with pre-rendered static layer ------------
+class StationView(QGraphicsView):
+    def __init__(self, scene):
+        super().__init__(scene)
+        self._static_layer: QPixmap|None = None
+
+    def set_static_layer(self, pix: QPixmap):
+        self._static_layer = pix
+        self.resetCachedContent(); self.viewport().update()
+
+    def drawBackground(self, painter, rect):
+        super().drawBackground(painter, rect)   # COL_BG fill
+        if self._static_layer is not None:
+            painter.drawPixmap(self.sceneRect().topLeft(), self._static_layer)
+
 # ------------ Main Window ------------
 @dataclass
 class Route:
     tracks: list[str]
     overlap: list[str]
     low_speed: bool = False
+    points: list[QPointF] = field(default_factory=list)  # West->East polyline
 
 class HateworkWindow(QMainWindow):
     def __init__(self):
@@ -249,9 +319,14 @@ class HateworkWindow(QMainWindow):
 
         # Scene & View
         self.scene = QGraphicsScene(0, 0, VIEW_W-20, VIEW_H-120)
-        self.view = QGraphicsView(self.scene)
+        self.view = StationView(self.scene)
         self.view.setBackgroundBrush(QBrush(COL_BG))
-        self.view.setRenderHint(QPainter.Antialiasing)
+        # render hints are sticky on the view; items don't set them per paint
+        self.view.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing | QPainter.SmoothPixmapTransform)
+        # small fixed scene: one full redraw beats many dirty rects / BSP upkeep
+        self.view.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        self.view.setOptimizationFlag(QGraphicsView.DontSavePainterState, True)
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
 
         # Buttons
         ctr = QWidget(); ctr_l = QHBoxLayout(ctr)
@@ -273,15 +348,16 @@ class HateworkWindow(QMainWindow):
         # Header labels
         self.h_title = QGraphicsSimpleTextItem("สถานีเฮทเวิร์ค / Hatework Station")
         self.h_title.setFont(QFont("Tahoma", 22, QFont.Bold)); self.h_title.setBrush(QBrush(COL_GREEN)); self.h_title.setPos(420, 6); self.scene.addItem(self.h_title)
+        self.h_title.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
         self.h_operator = QGraphicsSimpleTextItem("ผู้ควบคุม / Operator: สมชาย ใจดี")
         self.h_operator.setFont(QFont("Tahoma", 12)); self.h_operator.setBrush(QBrush(COL_LABEL)); self.h_operator.setPos(20, 10); self.scene.addItem(self.h_operator)
+        self.h_operator.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
         self.h_clock = QGraphicsSimpleTextItem("--:--:--")
         self.h_clock.setFont(QFont("Consolas", 18)); self.h_clock.setBrush(QBrush(COL_CYAN)); self.h_clock.setPos(20, 40); self.scene.addItem(self.h_clock)
         self.msg_area = QGraphicsSimpleTextItem("")
         self.msg_area.setFont(QFont("Consolas", 12)); self.msg_area.setBrush(QBrush(COL_BLUE)); self.msg_area.setPos(20, self.scene.height()-30); self.scene.addItem(self.msg_area)
 
-        # Yellow status boxes
-                # Yellow status boxes — ใช้ QLabel ผ่าน proxy ให้ข้อความแสดงและจัดกึ่งกลางแน่นอน
+        # Yellow status boxes — ข้อความเป็น QGraphicsTextItem (ไม่ใช้ widget proxy)
         def make_box(x, y, text):
             box_w, box_h = 240, 68
             pad = 10
@@ -292,25 +368,21 @@ class HateworkWindow(QMainWindow):
             box.setZValue(3)
             box.setBrush(QBrush(COL_BOX))
             box.setPen(QPen(QColor("#caa322"), 2))
+            box.setCacheMode(QGraphicsItem.DeviceCoordinateCache)   # static -> blit cached pixmap
             self.scene.addItem(box)
 
-            # สร้าง QLabel สำหรับข้อความ (ห่อบรรทัด + จัดกึ่งกลาง)
-            label = QLabel()
-            # ใช้ HTML สั้น ๆ เพื่อรองรับไทย/อังกฤษและขึ้นบรรทัด
-            label.setText(
-                f"<div style='text-align:center; font-family:Tahoma; "
-                f"font-weight:700; font-size:12px; color:#222;'>{text.replace(chr(10), '<br>')}</div>"
-            )
-            label.setWordWrap(True)
-            label.setFixedSize(box_w - 2*pad, box_h - 2*pad)
-            label.setStyleSheet("background: transparent;")  # โปร่งใสให้เห็นสีเหลืองของกล่อง
-
-            # ฝังเข้า scene แล้วผูกเป็นลูกของกล่อง
-            proxy = self.scene.addWidget(label)
-            proxy.setParentItem(box)
-            proxy.setZValue(box.zValue() + 1)
-            proxy.setPos(pad, pad)
-
+            # ข้อความลูกของกล่อง (ห่อบรรทัด + จัดกึ่งกลาง) รองรับไทย/อังกฤษ
+            font = QFont("Tahoma"); font.setPixelSize(12); font.setBold(True)
+            label = QGraphicsTextItem()
+            label.setParentItem(box)   # graphics parent (keeps it alive)
+            label.setFont(font)
+            label.setDefaultTextColor(QColor("#222"))
+            label.setHtml(f"<div align='center'>{text.replace(chr(10), '<br>')}</div>")
+            label.setTextWidth(box_w - 2*pad)
+            br = label.boundingRect()
+            label.setPos((box_w - br.width())/2, (box_h - br.height())/2)
+            label.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, False)
+            label.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
 
         make_box(20,  self.scene.height()-110, "00003\nPoints Emergency / ฉุกเฉินจุดตัด")
         make_box(280, self.scene.height()-110, "00003\nPoints Failed / จุดตัดขัดข้อง")
@@ -346,6 +418,9 @@ class HateworkWindow(QMainWindow):
         self.platform_loop_x1, self.platform_loop_x2, self.platform_loop_y = 520, 760, 250  # LOOP
         self._add_platform(self.platform_x1, self.platform_x2, self.platform_y, QColor(60, 80, 110, 50), QColor(120,150,200), "ชานชาลาหลัก / Platform (Main)")
         self._add_platform(self.platform_loop_x1, self.platform_loop_x2, self.platform_loop_y, QColor(60,110,80,50), QColor(120,200,150), "ชานชาลารอง / Platform (Loop)")
+        # dwell capture zones (±8px around each platform line)
+        self._main_plat_rect = QRectF(self.platform_x1, self.platform_y-8, self.platform_x2-self.platform_x1, 16)
+        self._loop_plat_rect = QRectF(self.platform_loop_x1, self.platform_loop_y-8, self.platform_loop_x2-self.platform_loop_x1, 16)
 
         # Station labels
         self._label(20, 90, "SOUTH (WEST) / สถานีใต้"); self._label(self.scene.width()-260, 90, "NORTH (EAST) / สถานีเหนือ")
@@ -353,14 +428,21 @@ class HateworkWindow(QMainWindow):
         self._label(305, 226, "15"); self._label(640, 226, "16"); self._label(975, 226, "17")
 
         # Beep sound (use QUrl for Windows path safety)
-        self.beep = QSoundEffect()
-        self.beep.setLoopCount(1)
-        self.beep.setVolume(0.22)
-        self.beep.setSource(QUrl.fromLocalFile(ensure_soft_beep_wav()))
+        self._beeps: list[QSoundEffect] = []
+        for _ in range(BEEP_POOL):
+            fx = QSoundEffect(self)
+            fx.setLoopCount(1)
+            fx.setVolume(0.22)
+            fx.setSource(QUrl.fromLocalFile(BEEP_WAV))
+            self._beeps.append(fx)
+        self._beep_idx = 0
 
         # One entry signal at WEST (left)
-        self.signal_W = SignalHead(180, 240, "S_W", self.beep)
+        self.signal_W = SignalHead(180, 240, "S_W", self.play_beep)
         self.scene.addItem(self.signal_W)
+
+        # Everything above except clock / message line / signal never changes -> one pixmap
+        self._freeze_static_layer((self.h_clock, self.msg_area, self.signal_W))
         
 
 
@@ -377,6 +459,13 @@ class HateworkWindow(QMainWindow):
                 low_speed=True
             ),
         }
+        # precompute each route's polyline once (shared track ends kept once)
+        for rt in self.routes.values():
+            for tn in rt.tracks:
+                trk = self.tracks[tn]
+                for p in (trk.p1, trk.p2):
+                    if not rt.points or math.hypot(p.x()-rt.points[-1].x(), p.y()-rt.points[-1].y()) > 0.5:
+                        rt.points.append(p)
 
 
 
@@ -385,14 +474,18 @@ class HateworkWindow(QMainWindow):
         self.platform_state = {"MAIN": None, "LOOP": None}  # parked TrainItem or None
         self.queue: deque[str] = deque()  # "MAIN" / "LOOP"
         self.active_path: str|None = None
-        self.approach_until = 0.0
+        self.approach_id: str|None = None   # train whose approach/checking phase is running
         self.trains: list[TrainItem] = []
         self.train_counter = 1
         self.running = False
+        self._pending_aspect = self.signal_W.aspect   # latest requested aspect
+        self._signal_scheduled = False
 
         # Timers
-        self.timer = QTimer(self); self.timer.timeout.connect(self.tick)
-        self.clock_timer = QTimer(self); self.clock_timer.timeout.connect(self._update_clock); self.clock_timer.start(250)
+        # Timer (single wakeup source: simulation frames + clock)
+        self._tick_count = 0
+        self.timer = QTimer(self); self.timer.timeout.connect(self.tick); self.timer.start(IDLE_TICK_MS)
+        self._update_clock()
 
         # Wire buttons
         self.btn_start.clicked.connect(self._start)
@@ -424,32 +517,80 @@ class HateworkWindow(QMainWindow):
 
     def _label(self, x, y, text, color=COL_TEXT, size=12):
         t = QGraphicsSimpleTextItem(text); t.setFont(QFont("Tahoma", size))
-        t.setBrush(QBrush(color)); t.setPos(x, y); self.scene.addItem(t); return t
+        t.setBrush(QBrush(color)); t.setPos(x, y); self.scene.addItem(t)
+        t.setCacheMode(QGraphicsItem.DeviceCoordinateCache)   # labels never change
+        return t
 
     def _add_platform(self, x1, x2, y, fill, pen_col, label):
         r = QGraphicsRectItem(x1, y-10, x2-x1, 20)
         r.setBrush(QBrush(fill)); r.setPen(QPen(pen_col, 1, Qt.DashLine)); r.setZValue(2); self.scene.addItem(r)
+        r.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
         self._label(x1, y-32, label, COL_LABEL, 11)
 
+    def _freeze_static_layer(self, live_items):
+        dpr = self.devicePixelRatioF()
+        rect = self.scene.sceneRect()
+        pix = QPixmap(int(rect.width()*dpr), int(rect.height()*dpr))
+        pix.setDevicePixelRatio(dpr)
+        pix.fill(Qt.transparent)
+        for it in live_items: it.setVisible(False)
+        p = QPainter(pix); p.setRenderHints(self.view.renderHints())
+        self.scene.render(p, QRectF(0, 0, rect.width(), rect.height()), rect)
+        p.end()
+        for it in live_items: it.setVisible(True)
+        # drop baked items from the live scene; tracks stay for occupied/reserved colors
+        for it in [i for i in self.scene.items() if i.parentItem() is None]:
+            if isinstance(it, TrackItem):
+                it.bake_normal()
+            elif it not in live_items:
+                self.scene.removeItem(it)
+        self.view.set_static_layer(pix)
+
+    def play_beep(self):
+        fx = self._beeps[self._beep_idx % BEEP_POOL]; self._beep_idx += 1
+        fx.play()
+
     def info(self, msg):
         self.msg_area.setText(msg)
 
+    # full frame rate only while something can move; idle = slow clock ticks
+    def _maybe_start_timer(self):
+        if self.running and self.timer.interval() != TICK_MS:
+            self.timer.start(TICK_MS)
+
+    def _maybe_idle_timer(self):
+        if (not self.trains and not self.queue and self.active_path is None
+                and self.timer.interval() != IDLE_TICK_MS):
+            self.timer.start(IDLE_TICK_MS)
+
     def _start(self):
         if not self.running:
             self.running = True
-            self.timer.start(33)
+            self.timer.start(TICK_MS)
             self.info("เริ่มจำลอง / Simulation started")
 
     # ---------- signals logic ----------
     def update_signals(self):
         # RED: if MAIN parked
         if self.platform_state["MAIN"] is not None:
-            self.signal_W.set_aspect("RED"); return
+            aspect = "RED"
         # YELLOW: during checking/approach
-        if self.active_path is not None and time.time() < self.approach_until:
-            self.signal_W.set_aspect("YELLOW"); return
+        elif self.active_path is not None and self.approach_id is not None:
+            aspect = "YELLOW"
         # otherwise GREEN
-        self.signal_W.set_aspect("GREEN")
+        else:
+            aspect = "GREEN"
+        # coalesce: several requests in one event-loop pass -> one set_aspect
+        if aspect == self._pending_aspect:
+            return
+        self._pending_aspect = aspect
+        if not self._signal_scheduled:
+            self._signal_scheduled = True
+            QTimer.singleShot(0, self._apply_signal)
+
+    def _apply_signal(self):
+        self._signal_scheduled = False
+        self.signal_W.set_aspect(self._pending_aspect)
 
     # ---------- call in / out ----------
     def call_in(self, target: str):
@@ -480,6 +621,7 @@ class HateworkWindow(QMainWindow):
             self.platform_state["MAIN"] = None
             self.info(f"{tr.train_id}: Call Out MAIN")
             self.update_signals()
+            self._maybe_start_timer()
             return
 
         # LOOP
@@ -492,6 +634,7 @@ class HateworkWindow(QMainWindow):
             self.platform_state["LOOP"] = None
             self.info(f"{tr.train_id}: Call Out LOOP")
             self.update_signals()
+            self._maybe_start_timer()
             return
 
         self.info("ไม่มีรถจอดในชานชาลา / No train parked")
@@ -504,28 +647,35 @@ class HateworkWindow(QMainWindow):
         rt: Route = self.routes[path]
         # reserve tracks + overlap
         for t in rt.tracks + rt.overlap:
-            self.tracks[t].reserved = True; self.tracks[t].update()
+            self.tracks[t].reserved = True
+        # route tracks stay occupied until the train clears the route
+        for t in rt.tracks:
+            self.tracks[t].occupied = True
         self.active_path = path
-        self.approach_until = time.time() + APPROACH_TIME
+        tid = f"TR{self.train_counter:03d}"; self.train_counter += 1
+        self.approach_id = tid
         self.update_signals()  # YELLOW
-        # build path points (West->East)
-        pts = []
-        for tn in rt.tracks:
-            trk = self.tracks[tn]
-            pts.extend([trk.p1, trk.p2])
+        QTimer.singleShot(int(APPROACH_TIME*1000), lambda tid=tid: self._approach_finished(tid))
         # spawn train at left
-        tid = f"TR{self.train_counter:03d}"; self.train_counter += 1
         speed = 3.4 if not rt.low_speed else 2.6
-        train = TrainItem(pts, tid, speed_px=speed)
+        train = TrainItem(rt.points, tid, speed_px=speed)
         self.scene.addItem(train); self.trains.append(train)
         self.info(f"{tid} departed on {path}")
+        self._maybe_start_timer()
+
+    def _approach_finished(self, tid):
+        # ignore stale shots from a route that was released/re-dispatched meanwhile
+        if self.approach_id != tid:
+            return
+        self.approach_id = None
+        self.update_signals()  # GREEN unless MAIN parked
 
     def emergency_release(self):
         # immediate release (demo)
         for t in self.tracks.values():
-            t.reserved = False; t.occupied = False; t.update()
+            t.reserved = False; t.occupied = False
         self.active_path = None
-        self.approach_until = 0
+        self.approach_id = None
         self.update_signals()
         self.info("Route Released / ปลดเส้นทาง")
 
@@ -536,11 +686,10 @@ class HateworkWindow(QMainWindow):
             tr.skip_platform_ticks -= 1
             return
 
-        x, y = tr.pos().x(), tr.pos().y()
-        def in_rng(px1, px2, py): return abs(y - py) < 8 and px1 <= x <= px2
+        pos = tr.pos()
 
         # MAIN platform — allow dwell only once per trip
-        if in_rng(self.platform_x1, self.platform_x2, self.platform_y):
+        if self._main_plat_rect.contains(pos):
             if (self.platform_state["MAIN"] is None and not tr.in_dwell and not tr.has_dwelled_main):
                 tr.in_dwell = True
                 tr.dwell_counter = DWELL_FRAMES
@@ -550,7 +699,7 @@ class HateworkWindow(QMainWindow):
                 self.info(f"{tr.train_id}: Platform MAIN dwell")
 
         # LOOP platform — allow dwell once and only if MAIN not parked
-        if in_rng(self.platform_loop_x1, self.platform_loop_x2, self.platform_loop_y):
+        if self._loop_plat_rect.contains(pos):
             if (self.platform_state["MAIN"] is None and
                 self.platform_state["LOOP"] is None and
                 not tr.in_dwell and not tr.has_dwelled_loop):
@@ -568,42 +717,33 @@ class HateworkWindow(QMainWindow):
                 tr.speed_px = 0  # stay stopped until Call Out
 
     def tick(self):
+        self._tick_count += 1
+        if self.timer.interval() == IDLE_TICK_MS or self._tick_count % CLOCK_EVERY == 0:
+            self._update_clock()
         if not self.running:
             return
-        # approach phase -> after timer, set GREEN if eligible
-        if self.active_path is not None and time.time() >= self.approach_until:
-            self.signal_W.set_aspect("GREEN")
-
         # move trains
-        finished = []
         for tr in self.trains:
-            # mark route tracks occupied while train is on path
-            if self.active_path:
-                for tname in self.routes[self.active_path].tracks:
-                    self.tracks[tname].occupied = True
             self._check_platform_hit(tr)
-            done = tr.step()
-            if done:
-                finished.append(tr)
+        finished = step_trains(self.trains)
 
         # clear finished and release route
         if finished:
             for tr in finished:
                 self.scene.removeItem(tr)
-                if tr in self.trains: self.trains.remove(tr)
                 self.info(f"{tr.train_id}: Arrived / ถึงปลายทาง")
+            done_set = set(finished)
+            self.trains = [t for t in self.trains if t not in done_set]
             for t in self.tracks.values():
-                t.reserved = False; t.occupied = False; t.update()
+                t.reserved = False; t.occupied = False
             self.active_path = None
-            self.approach_until = 0
+            self.approach_id = None
             self.update_signals()
             # dispatch next if queued
             if self.queue:
                 self._dispatch_if_possible()
 
-        # refresh
-        for t in self.tracks.values():
-            t.update()
+        self._maybe_idle_timer()
 
 # ------------ Main ------------
 def main():